@@ -3,35 +3,166 @@ WakeBot Calibration Command
 Enhanced calibration with automatic clap detection and precise threshold calculation.
 """
 
+import math
 import time
 import sys
+import queue
+import threading
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from collections import deque
 from typing import List, Tuple
-from wakebot.core import WakeBotLogger
+from wakebot.core import WakeBotLogger, load_config
 from wakebot.triggers.audio.engine import AudioStream
 
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def _rms_and_peak_loop(samples):
+    """Single pass over a sample buffer returning (RMS, max |sample|)"""
+    if len(samples) == 0:
+        return 0.0, 0.0
+    total = 0.0
+    peak = 0.0
+    for v in samples:
+        f = float(v)
+        total += f * f
+        a = abs(f)
+        if a > peak:
+            peak = a
+    return math.sqrt(total / len(samples)), peak
+
+
+def _rms_and_peak_numpy(samples):
+    """Returns (RMS, max |sample|) of a sample buffer (NumPy fallback)"""
+    if len(samples) == 0:
+        return 0.0, 0.0
+    audio_float = samples.astype(np.float64)
+    rms = math.sqrt(np.dot(audio_float, audio_float) / len(samples))
+    return rms, float(np.abs(audio_float).max())
+
+
+if HAS_NUMBA:
+    try:
+        rms_and_peak = njit(cache=True, fastmath=True)(_rms_and_peak_loop)
+    except RuntimeError:
+        # No on-disk cache locator (e.g. frozen builds): compile per run
+        rms_and_peak = njit(fastmath=True)(_rms_and_peak_loop)
+else:
+    rms_and_peak = _rms_and_peak_numpy
+
+
+class RunningMean:
+    """Fixed-window rolling mean over a NumPy ring buffer with O(1) updates"""
+    
+    def __init__(self, maxlen: int):
+        self.values = np.zeros(maxlen, dtype=np.float32)
+        self.count = 0
+        self.total = 0.0
+        self._next = 0
+    
+    def push(self, value: float):
+        """Add a value, evicting the oldest once the window is full"""
+        if self.count == len(self.values):
+            self.total -= float(self.values[self._next])
+        else:
+            self.count += 1
+        self.values[self._next] = value
+        self.total += float(self.values[self._next])
+        self._next = (self._next + 1) % len(self.values)
+    
+    @property
+    def mean(self) -> float:
+        """Mean of the values currently in the window"""
+        return self.total / self.count if self.count else 0.0
+
+
+class ConsolePrinter:
+    """Writes console output from a daemon thread so slow terminals can't stall sampling"""
+    
+    def __init__(self, maxsize: int = 2):
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="CalibrationPrinter", daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        # Coalesce writes: flush only when the queue drains, after a few
+        # unflushed status redraws, or for messages that must show at once
+        unflushed = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                sys.stdout.flush()
+                break
+            text, urgent = item
+            sys.stdout.write(text)
+            unflushed += 1
+            if urgent or unflushed >= 5 or self._queue.empty():
+                sys.stdout.flush()
+                unflushed = 0
+    
+    def status(self, text: str):
+        """Queue a status redraw, dropping it if the printer is behind"""
+        try:
+            self._queue.put_nowait((text, False))
+        except queue.Full:
+            pass
+    
+    def message(self, text: str):
+        """Queue text that must not be dropped"""
+        self._queue.put((text, True))
+    
+    def close(self):
+        """Flush pending output and stop the printer thread"""
+        self._queue.put(None)
+        self._thread.join(timeout=1.0)
+
+
+def _store(buf: np.ndarray, index: int, value: float) -> np.ndarray:
+    """Write value at index, doubling the buffer first if it is full"""
+    if index == len(buf):
+        buf = np.resize(buf, 2 * len(buf))
+    buf[index] = value
+    return buf
+
+
+PEAK_WINDOW = 5
+
+# Phase 1 sample peak (int16 amplitude, about -56 dBFS) below which the
+# microphone is treated as muted or with its input gain turned to zero
+QUIET_PEAK = 50
+
+# Span of the rolling "Avg" ambient level on the status line
+AVG_WINDOW_S = 2.5
+
+
+def _peak_indices(rms: np.ndarray, threshold: float, window_size: int = PEAK_WINDOW) -> np.ndarray:
+    """Indices of samples above threshold and louder than every neighbour within window_size"""
+    if len(rms) < 2 * window_size + 1:
+        return np.empty(0, dtype=np.intp)
+    
+    # One row per candidate sample: [i - window_size, i + window_size]
+    windows = sliding_window_view(rms, 2 * window_size + 1)
+    center = rms[window_size:-window_size]
+    neighbor_max = np.maximum(windows[:, :window_size].max(axis=1),
+                              windows[:, window_size + 1:].max(axis=1))
+    # A peak must be strictly louder than every neighbour in its window
+    mask = (center > threshold) & (center > neighbor_max)
+    return np.flatnonzero(mask) + window_size
+
 
 def detect_claps(rms_values: List[float], timestamps: List[float], 
                  threshold_preview: float = 1000) -> List[Tuple[float, float]]:
     """Detect clap peaks in RMS data"""
     claps = []
-    if len(rms_values) < 10:
-        return claps
-    
-    window_size = 5
-    for i in range(window_size, len(rms_values) - window_size):
-        current_rms = rms_values[i]
-        if current_rms > threshold_preview:
-            is_peak = True
-            for j in range(i - window_size, i + window_size + 1):
-                if j != i and rms_values[j] >= current_rms:
-                    is_peak = False
-                    break
-            
-            if is_peak:
-                if not claps or (timestamps[i] - claps[-1][0]) > 0.3:
-                    claps.append((timestamps[i], current_rms))
+    rms = np.asarray(rms_values, dtype=np.float32)
+    for i in _peak_indices(rms, threshold_preview):
+        if not claps or (timestamps[i] - claps[-1][0]) > 0.3:
+            claps.append((timestamps[i], float(rms[i])))
     return claps
 
 
@@ -51,7 +182,14 @@ def run_calibrate():
     input("Press ENTER when ready to start calibration...")
     print()
     
-    audio = AudioStream()
+    # Calibrate with the detector's own chunking: RMS of a short transient
+    # depends on how many frames it is averaged over
+    config = load_config()
+    audio = AudioStream(
+        chunk_size=config.chunk_size,
+        sample_rate=config.sample_rate,
+        channels=config.channels
+    )
     
     try:
         if not audio.start_stream():
@@ -60,74 +198,138 @@ def run_calibrate():
         
         logger.info("🎤 Microphone initialized successfully")
         
-        # Collect RMS values
-        rms_values: List[float] = []
-        timestamps: List[float] = []
-        min_rms = float('inf')
-        max_rms = 0.0
-        total_rms = 0.0
-        sample_count = 0
+        # Compile the RMS kernel before any timing starts. Warm up with a
+        # read-only frombuffer view like the callback delivers, since numba
+        # specializes separately on read-only arrays.
+        rms_and_peak(np.frombuffer(bytes(2 * audio.chunk_size * audio.channels), dtype=np.int16))
         
+        # Collect RMS values (preallocated, grown on demand)
+        rms_buf = np.empty(2048, dtype=np.float32)
+        ts_buf = np.empty(2048, dtype=np.float32)
+        n = 0
+        baseline_n = 0
+        scan_from = 0
+        
+        # Realtime clap detections as parallel arrays (time, RMS)
+        clap_ts = np.empty(64, dtype=np.float32)
+        clap_rms = np.empty(64, dtype=np.float32)
         detected_clap_count = 0
-        detected_claps_realtime: List[Tuple[float, float]] = []
+        # Window length in chunks, so the span stays AVG_WINDOW_S at any chunk size
+        recent_rms = RunningMean(maxlen=max(1, round(AVG_WINDOW_S * audio.sample_rate / audio.chunk_size)))
         
-        start_time = time.time()
+        start_time = time.monotonic()
         current_phase = 1
-        baseline_max = 0
+        baseline_max = 0.0
+        baseline_sum = 0.0
+        baseline_peak = 0.0
+        clap_floor = 0.0
+        
+        # Status line is redrawn at 10 Hz; detection still runs on every sample
+        status_prefix = "\rPhase: 1 | "
+        last_print_t = 0.0
+        
+        # Chunks are stamped at capture time on the PortAudio callback thread;
+        # the main loop drains them and owns the stream health checks
+        chunks: deque = deque(maxlen=64)
+        audio.chunk_handler = lambda chunk: chunks.append((time.monotonic(), chunk))
+        
+        # Measure the same level the detector compares against the threshold
+        onset_mode = config.onset_detection
+        unit = "Onset" if onset_mode else "RMS"
+        if onset_mode:
+            logger.info("onset_detection is on: calibrating on onset strength instead of RMS")
         
         print("⏱️  Phase 1: Measuring ambient noise baseline (10 seconds)...\n")
+        printer = ConsolePrinter()
         
         try:
             while True:
-                chunk = audio.read_chunk()
-                rms = audio.calculate_rms(chunk)
-                current_time = time.time()
-                elapsed = current_time - start_time
+                if not chunks:
+                    if not audio.is_stream_active(max_age=0.5) or audio.is_stalled():
+                        logger.warning("Microphone stream stopped. Restarting...")
+                        if not audio.restart_stream() or not audio.is_stream_active():
+                            logger.error("Could not restart microphone stream.")
+                            break
+                    time.sleep(0.005)
+                    continue
                 
-                rms_values.append(rms)
-                timestamps.append(elapsed)
-                min_rms = min(min_rms, rms)
-                max_rms = max(max_rms, rms)
-                total_rms += rms
-                sample_count += 1
+                now, chunk = chunks.popleft()
+                rms, chunk_peak = rms_and_peak(chunk)
+                if onset_mode:
+                    # The sample peak still feeds the mute check below
+                    rms = audio.onset_strength(chunk)
+                elapsed = now - start_time
+                
+                rms_buf = _store(rms_buf, n, rms)
+                ts_buf = _store(ts_buf, n, elapsed)
+                n += 1
+                recent_rms.push(rms)
                 
                 if current_phase == 1:
-                    baseline_max = max(baseline_max, rms)
+                    baseline_sum += rms
+                    if rms > baseline_max:
+                        baseline_max = rms
+                    if chunk_peak > baseline_peak:
+                        baseline_peak = chunk_peak
                     if elapsed >= 10:
                         current_phase = 2
-                        print(f"\n✅ Baseline established! Max baseline RMS: {baseline_max:.0f}")
-                        print(f"⏱️  Phase 2: Clap 5-10 times (Press Ctrl+C when done)\n")
+                        baseline_n = n
+                        scan_from = n
+                        # baseline_max is frozen from here on, so fold both
+                        # clap gates into a single cached threshold
+                        clap_floor = max(baseline_max * 2.5, 100.0)
+                        status_prefix = "\rPhase: 2 | "
+                        printer.message(f"\n✅ Baseline established! Avg baseline {unit}: {baseline_sum / n:.0f}, "
+                                        f"max: {baseline_max:.0f}\n"
+                                        f"⏱️  Phase 2: Clap 5-10 times (Press Ctrl+C when done)\n\n")
+                        if baseline_peak < QUIET_PEAK:
+                            printer.message(f"⚠️  Microphone is near silent (peak {baseline_peak:.0f}). "
+                                            f"Check that it is not muted and its input level is up.\n\n")
                 
-                if current_phase == 2:
-                    # Simple peak detection for feedback
-                    if rms > baseline_max * 2.5 and rms > 100:
+                if current_phase == 2 and n % 10 == 0:
+                    # Scan the new samples with the same peak finder as detect_claps.
+                    # A peak is only final once PEAK_WINDOW later samples exist.
+                    segment_start = scan_from - PEAK_WINDOW
+                    for i in _peak_indices(rms_buf[segment_start:n], clap_floor) + segment_start:
                         # Simple debounce
-                        if not detected_claps_realtime or (elapsed - detected_claps_realtime[-1][0] > 0.5):
+                        if detected_clap_count == 0 or (ts_buf[i] - clap_ts[detected_clap_count - 1] > 0.5):
+                            clap_ts = _store(clap_ts, detected_clap_count, ts_buf[i])
+                            clap_rms = _store(clap_rms, detected_clap_count, rms_buf[i])
                             detected_clap_count += 1
-                            detected_claps_realtime.append((elapsed, rms))
-                            print(f"\n   👏 Clap #{detected_clap_count} detected! (RMS: {rms:.0f})")
+                            printer.message(f"\n   👏 Clap #{detected_clap_count} detected! ({unit}: {rms_buf[i]:.0f})\n")
+                    scan_from = max(scan_from, n - PEAK_WINDOW)
                 
-                status = f"\rPhase: {current_phase} | RMS: {rms:6.0f} | Claps: {detected_clap_count}"
-                print(status, end='', flush=True)
-                time.sleep(0.05)
+                if now - last_print_t >= 0.1:
+                    last_print_t = now
+                    printer.status(f"{status_prefix}{unit}: {rms:6.0f} | Avg: {recent_rms.mean:6.0f} | Claps: {detected_clap_count}")
                 
         except KeyboardInterrupt:
-            print(f"\n\nStopping calibration...")
+            printer.message(f"\n\nStopping calibration...\n")
+        finally:
+            printer.close()
         
         audio.stop_stream()
         
         # Analysis (Simplified version of the full analysis)
-        if sample_count > 0:
-            avg_rms = total_rms / sample_count
+        if n > 0:
+            recorded = rms_buf[:n]
+            baseline_arr = recorded[:baseline_n or n]
+            baseline_avg = baseline_sum / len(baseline_arr)
+            baseline_std = float(baseline_arr.std())
+            
             print("\n" + "="*70)
             print(" " * 15 + "📊 CALIBRATION ANALYSIS RESULTS")
             print("="*70)
+            print(f"   {'Average ' + unit + ':':<17}{recorded.mean():.0f}")
+            print(f"   Baseline:        {baseline_avg:.0f} ± {baseline_std:.0f}")
             print(f"   Max Baseline:    {baseline_max:.0f}")
-            print(f"   Max Peak:        {max_rms:.0f}")
+            print(f"   Max Peak:        {recorded.max():.0f}")
             print(f"   Claps Detected:  {detected_clap_count}")
             
             if detected_clap_count > 0:
-                clap_avg = sum(c[1] for c in detected_claps_realtime) / detected_clap_count
+                clap_arr = clap_rms[:detected_clap_count]
+                clap_avg = float(clap_arr.mean())
+                print(f"   {'Clap ' + unit + ':':<17}{clap_arr.min():.0f} - {clap_arr.max():.0f} (avg {clap_avg:.0f})")
                 recommended = int(clap_avg * 0.5)
                 recommended = max(recommended, int(baseline_max * 2))
                 print(f"\n🎯 RECOMMENDED THRESHOLD: {recommended}")
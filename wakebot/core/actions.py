@@ -19,9 +19,65 @@ VK_RETURN = 0x0D
 VK_MEDIA_PLAY_PAUSE = 0xB3
 VK_MEDIA_STOP = 0xB2
 KEYEVENTF_KEYUP = 0x0002
+INPUT_KEYBOARD = 1
 WM_SYSCOMMAND = 0x0112
 SC_MONITORPOWER = 0xF170
 
+# user32 entry points, resolved once at import rather than through
+# ctypes.windll's per-access attribute lookup
+if platform.system() == "Windows":
+    from ctypes import wintypes
+
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+
+    _mouse_event = _user32.mouse_event
+    _mouse_event.argtypes = [wintypes.DWORD, wintypes.DWORD, wintypes.DWORD,
+                             wintypes.DWORD, ctypes.c_size_t]
+    _mouse_event.restype = None
+
+    _SendMessageW = _user32.SendMessageW
+    _SendMessageW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+    _SendMessageW.restype = wintypes.LPARAM
+
+    class _MOUSEINPUT(ctypes.Structure):
+        _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG),
+                    ("mouseData", wintypes.DWORD), ("dwFlags", wintypes.DWORD),
+                    ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+    class _KEYBDINPUT(ctypes.Structure):
+        _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD),
+                    ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD),
+                    ("dwExtraInfo", ctypes.c_size_t)]
+
+    class _INPUT(ctypes.Structure):
+        # MOUSEINPUT is the largest union member, so it sets sizeof(INPUT)
+        class _U(ctypes.Union):
+            _fields_ = [("mi", _MOUSEINPUT), ("ki", _KEYBDINPUT)]
+        _anonymous_ = ("u",)
+        _fields_ = [("type", wintypes.DWORD), ("u", _U)]
+
+    _SendInput = _user32.SendInput
+    _SendInput.argtypes = [wintypes.UINT, ctypes.POINTER(_INPUT), ctypes.c_int]
+    _SendInput.restype = wintypes.UINT
+
+    def _key_tap(vk: int):
+        """Key down + key up as one INPUT array"""
+        inputs = (_INPUT * 2)()
+        for inp, flags in zip(inputs, (0, KEYEVENTF_KEYUP)):
+            inp.type = INPUT_KEYBOARD
+            inp.ki.wVk = vk
+            inp.ki.dwFlags = flags
+        return inputs
+
+    def _send_input(inputs):
+        """Inject an INPUT array atomically; raises if Windows rejects it"""
+        if _SendInput(len(inputs), inputs, ctypes.sizeof(_INPUT)) != len(inputs):
+            raise ctypes.WinError(ctypes.get_last_error())
+
+    # Prebuilt taps for the wake and goodnight routines
+    _ENTER_TAP = _key_tap(VK_RETURN)
+    _PLAY_PAUSE_TAP = _key_tap(VK_MEDIA_PLAY_PAUSE)
+
 # Optional imports for Window Management
 try:
     import win32gui
@@ -45,6 +101,13 @@ class WakeBotActions:
         self.workspace_state = workspace_state
         self.last_action_time = 0.0
         self.cooldown = 2.0  # Minimum seconds between actions
+        self._code_path: Optional[str] = None  # Resolved VS Code launcher
+
+        # Platform-specific routines, resolved once instead of per call
+        self._wake_impl = {"Windows": self._wake_windows}.get(self.system, self._wake_unsupported)
+        self._goodnight_impl = {"Windows": self._goodnight_windows}.get(
+            self.system, self._goodnight_unsupported
+        )
 
         if self.event_bus:
             self.event_bus.subscribe("USER_ARRIVED", self._on_user_arrived)
@@ -75,20 +138,21 @@ class WakeBotActions:
         STAGE 1: Wake & Unlock Routine
         Jiggles mouse, waits for Victus display, and drops lock screen.
         """
-        if self.system != "Windows":
-            return False
+        return self._wake_impl()
+
+    def _wake_unsupported(self):
+        return False
 
+    def _wake_windows(self):
         try:
             # Jiggle mouse to wake hardware
-            ctypes.windll.user32.mouse_event(MOUSEEVENTF_MOVE, 1, 1, 0, 0)
+            _mouse_event(MOUSEEVENTF_MOVE, 1, 1, 0, 0)
             
             # 1.5s hardware delay for Victus display to initialize
             time.sleep(1.5)
             
             # Press 'Enter' and release to drop lock screen
-            ctypes.windll.user32.keybd_event(VK_RETURN, 0, 0, 0)
-            time.sleep(0.05)
-            ctypes.windll.user32.keybd_event(VK_RETURN, 0, KEYEVENTF_KEYUP, 0)
+            _send_input(_ENTER_TAP)
             
             if self.logger:
                 self.logger.action("System Wake & Unlock triggered")
@@ -98,14 +162,21 @@ class WakeBotActions:
                 self.logger.error(f"Wake failed: {e}")
             return False
 
+    def _vscode_command(self) -> Optional[str]:
+        """Resolve the VS Code launcher once; a miss is retried on the next call."""
+        if self._code_path is None:
+            self._code_path = shutil.which('code')
+        return self._code_path
+
     def launch_or_maximize(self):
         """
         STAGE 2: Workspace Management
         Maximizes VS Code if open, otherwise launches it.
         """
         if self.system != "Windows" or not win32gui:
-            if shutil.which('code'):
-                subprocess.Popen(['code'])
+            code_path = self._vscode_command()
+            if code_path:
+                subprocess.Popen([code_path])
             else:
                 if self.logger:
                     self.logger.error("VS Code ('code') not found in PATH.")
@@ -132,8 +203,9 @@ class WakeBotActions:
         else:
             if self.logger:
                 self.logger.info("Launching VS Code...")
-            if shutil.which('code'):
-                subprocess.Popen(['code'])
+            code_path = self._vscode_command()
+            if code_path:
+                subprocess.Popen([code_path])
             else:
                 if self.logger:
                     self.logger.error("VS Code ('code') not found in PATH.")
@@ -175,14 +247,19 @@ class WakeBotActions:
         if self.logger:
             self.logger.action("GOODNIGHT SEQUENCE TRIGGERED")
         
+        self._goodnight_impl()
+
+    def _goodnight_unsupported(self):
+        if self.logger:
+            self.logger.error(f"Goodnight sequence is not supported on {self.system}.")
+
+    def _goodnight_windows(self):
         try:
             # Pause Music
-            ctypes.windll.user32.keybd_event(VK_MEDIA_PLAY_PAUSE, 0, 0, 0)
-            time.sleep(0.05)
-            ctypes.windll.user32.keybd_event(VK_MEDIA_PLAY_PAUSE, 0, KEYEVENTF_KEYUP, 0)
+            _send_input(_PLAY_PAUSE_TAP)
             
             # Turn off Monitor
-            ctypes.windll.user32.SendMessageW(0xFFFF, WM_SYSCOMMAND, SC_MONITORPOWER, 2)
+            _SendMessageW(0xFFFF, WM_SYSCOMMAND, SC_MONITORPOWER, 2)
             
             if self.logger:
                 self.logger.info("Monitor turned off, Music paused.")
@@ -1,6 +1,6 @@
 """
 WakeBot Audio Orchestrator
-Consolidates the 3-thread audio pipeline (Producer, Worker, Watcher)
+Consolidates the audio pipeline (PortAudio callback, Dispatcher, Watcher)
 to eliminate code duplication between audio and vision commands.
 """
 
@@ -49,6 +49,11 @@ class AudioOrchestrator:
                 threshold=config.threshold,
                 double_clap_window_ms=config.double_clap_window_ms
             )
+        # Level fed to the clap detector: raw RMS, or onset (energy novelty)
+        # which ignores sustained loud sounds such as music or speech.
+        # Both run on the callback thread, so RMS stays on the CPU.
+        self._clap_level = (self.engine.onset_strength if config.onset_detection
+                            else self.engine.calculate_rms_cpu)
 
         self.voice_detector = None
         if config.voice_enabled:
@@ -61,8 +66,12 @@ class AudioOrchestrator:
             except Exception as e:
                 self.logger.error(f"Failed to initialize voice detector: {e}")
 
+        # Detection runs on PortAudio's callback thread; actions are handed
+        # to the dispatcher thread so the callback never blocks.
+        self.clap_actions: queue.SimpleQueue = queue.SimpleQueue()
+        self.engine.chunk_handler = self._on_chunk
+
         # Threading infrastructure
-        self.audio_queue = queue.Queue(maxsize=20)
         self.stop_all = threading.Event()
         self.paused = threading.Event()
         self.threads = []
@@ -73,8 +82,7 @@ class AudioOrchestrator:
             self.voice_detector.start()
 
         self.threads = [
-            threading.Thread(target=self._producer_loop, name="AudioProducer", daemon=True),
-            threading.Thread(target=self._worker_loop, name="DetectionWorker", daemon=True),
+            threading.Thread(target=self._dispatch_loop, name="ActionDispatcher", daemon=True),
             threading.Thread(target=self._voice_watcher_loop, name="VoiceWatcher", daemon=True),
         ]
 
@@ -103,53 +111,50 @@ class AudioOrchestrator:
     # Thread Loops
     # ------------------------------------------------------------------
 
-    def _producer_loop(self):
-        """Producer thread: captures microphone stream and feeds the queue."""
+    def _on_chunk(self, chunk):
+        """Callback thread: detect claps and feed the voice detector."""
+        if self.paused.is_set():
+            return
+        try:
+            if self.clap_detector:
+                level = self._clap_level(chunk)
+                clap_action = self.clap_detector.process(level)
+                if clap_action:
+                    self.clap_actions.put_nowait(clap_action)
+
+            if self.voice_detector:
+                self.voice_detector.add_audio(chunk)
+        except Exception as e:
+            self.logger.error(f"Audio callback error: {e}")
+
+    def _dispatch_loop(self):
+        """Dispatcher thread: runs clap actions and restarts a dead stream."""
         if not self.engine.start_stream():
             self.logger.error("Audio stream failed to start. Check microphone permissions.")
             return
 
+        restart_attempts = 0
         while not self.stop_all.is_set():
-            if self.paused.is_set():
-                time.sleep(0.1)
-                continue
-            try:
-                chunk = self.engine.read_chunk()
-                if not self.audio_queue.full():
-                    self.audio_queue.put_nowait(chunk)
-            except Exception:
-                self.engine.restart_stream()
-                time.sleep(1)
-
-    def _worker_loop(self):
-        """Worker thread: processes audio for claps and feeds voice detector."""
-        while not self.stop_all.is_set():
-            if self.paused.is_set():
-                time.sleep(0.1)
-                continue
             try:
-                chunk = self.audio_queue.get(timeout=0.5)
+                clap_action = self.clap_actions.get(timeout=0.5)
             except queue.Empty:
+                if self.stop_all.is_set():
+                    break
+                # A stalled device can still report active, so also require
+                # that callbacks arrived within the last second
+                if self.engine.is_stream_active() and not self.engine.is_stalled(timeout=1.0):
+                    restart_attempts = 0
+                    continue
+                if restart_attempts == 0:
+                    self.logger.warning("Microphone stream stopped delivering audio. Restarting...")
+                self.engine.restart_stream(attempt=restart_attempts)
+                restart_attempts += 1
                 continue
 
-            try:
-                # Process Claps
-                if self.clap_detector:
-                    rms = self.engine.calculate_rms(chunk)
-                    clap_action = self.clap_detector.process(rms)
-
-                    if clap_action == "SINGLE":
-                        self._trigger_wake()
-                    elif clap_action == "DOUBLE":
-                        self._trigger_sleep()
-
-                # Process Voice (Feed the model)
-                if self.voice_detector:
-                    self.voice_detector.add_audio(chunk)
-
-                self.audio_queue.task_done()
-            except Exception as e:
-                self.logger.error(f"Audio worker error: {e}")
+            if clap_action == "SINGLE":
+                self._trigger_wake()
+            elif clap_action == "DOUBLE":
+                self._trigger_sleep()
 
     def _voice_watcher_loop(self):
         """Watcher thread: monitors voice detector for keyword matches."""
@@ -8,12 +8,18 @@ import os
 from dataclasses import dataclass, asdict
 from typing import Optional, List, Tuple
 
+try:
+    import orjson
+    _loads = orjson.loads  # C parser; its JSONDecodeError subclasses json's
+except ImportError:
+    _loads = json.loads
+
 
 @dataclass
 class WakeBotConfig:
     """WakeBot configuration dataclass"""
     # Audio Settings
-    chunk_size: int = 1024
+    chunk_size: int = 256
     sample_rate: int = 44100
     channels: int = 1
     
@@ -23,6 +29,7 @@ class WakeBotConfig:
     cooldown_ms: int = 100
     double_clap_window_ms: int = 500
     triple_clap_window_ms: int = 700
+    onset_detection: bool = False  # Compare threshold to energy novelty instead of raw RMS
     
     # Voice Settings
     voice_enabled: bool = True
@@ -60,17 +67,16 @@ class WakeBotConfig:
     
     @classmethod
     def from_dict(cls, data: dict) -> 'WakeBotConfig':
-        """Create config from dictionary"""
-        # Handle tuple/list conversion if necessary
-        if "wake_phrases" in data and isinstance(data["wake_phrases"], list):
-            data["wake_phrases"] = tuple(data["wake_phrases"])
-        if "sensitive_apps" in data and isinstance(data["sensitive_apps"], list):
-            data["sensitive_apps"] = tuple(data["sensitive_apps"])
-        
-        # Filter for only valid dataclass fields
-        valid_keys = {f.name for f in cls.__dataclass_fields__.values()}
+        """Create config from dictionary, ignoring keys this version doesn't know"""
+        # Filter for only valid dataclass fields (copying, so the caller's dict is untouched)
+        valid_keys = cls.__dataclass_fields__.keys()
         filtered_data = {k: v for k, v in data.items() if k in valid_keys}
         
+        # Handle tuple/list conversion if necessary
+        for key in ("wake_phrases", "sensitive_apps"):
+            if isinstance(filtered_data.get(key), list):
+                filtered_data[key] = tuple(filtered_data[key])
+        
         return cls(**filtered_data)
 
 
@@ -80,10 +86,12 @@ def load_config(config_path: str = "wakebot_config.json") -> WakeBotConfig:
     """
     if os.path.exists(config_path):
         try:
-            with open(config_path, 'r') as f:
-                data = json.load(f)
-                return WakeBotConfig.from_dict(data)
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            with open(config_path, 'rb') as f:
+                data = _loads(f.read())
+            return WakeBotConfig.from_dict(data)
+        except (ValueError, KeyError, TypeError) as e:
+            # ValueError covers both parsers' JSONDecodeError and a non-UTF-8
+            # file (UnicodeDecodeError), e.g. a config saved as ANSI on Windows
             print(f"Warning: Could not load config from {config_path}: {e}")
             print("Using default configuration.")
             return WakeBotConfig()
@@ -1,31 +1,57 @@
 import sys
-from datetime import datetime
+import time
 from colorama import init, Fore, Style
 
 # Initialize colorama for Windows
 init()
 
+# Pre-rendered "LEVEL   | " prefixes (color codes and padding done once)
+_PREFIXES = {
+    level: f"{color}{Style.BRIGHT}{level:7}{Style.RESET_ALL} | "
+    for level, color in (
+        ("INFO", Fore.CYAN),
+        ("WARNING", Fore.YELLOW),
+        ("ERROR", Fore.RED),
+        ("ACTION", Fore.GREEN),
+    )
+}
+
+# Timestamp cache: strftime only runs when the wall-clock second changes
+_last_sec = -1
+_last_stamp = ""
+
+
+def _timestamp() -> str:
+    """Dimmed [HH:MM:SS] for the current second"""
+    global _last_sec, _last_stamp
+    sec = int(time.time())
+    if sec != _last_sec:
+        # Publish the string before the second so readers never pair a new
+        # second with a stale string
+        _last_stamp = f"{Style.DIM}[{time.strftime('%H:%M:%S', time.localtime(sec))}]{Style.RESET_ALL} "
+        _last_sec = sec
+    return _last_stamp
+
+
 class WakeBotLogger:
     """Centralized logger for WakeBot with color support."""
-    
+
     def __init__(self, quiet=False):
         self.quiet = quiet
 
-    def _log(self, level: str, color: str, message: str):
+    def _log(self, level: str, message: str):
         if self.quiet and level == "INFO":
             return
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"{Style.DIM}[{timestamp}]{Style.RESET_ALL} {color}{Style.BRIGHT}{level:7}{Style.RESET_ALL} | {message}")
+        print(_timestamp() + _PREFIXES[level] + message)
 
     def info(self, message: str):
-        self._log("INFO", Fore.CYAN, message)
+        self._log("INFO", message)
 
     def warning(self, message: str):
-        self._log("WARNING", Fore.YELLOW, message)
+        self._log("WARNING", message)
 
     def error(self, message: str):
-        self._log("ERROR", Fore.RED, message)
+        self._log("ERROR", message)
 
     def action(self, message: str):
-        self._log("ACTION", Fore.GREEN, message)
-
+        self._log("ACTION", message)
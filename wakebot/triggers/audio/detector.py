@@ -8,6 +8,39 @@ from typing import Optional, Any
 from wakebot.core.detector import BaseDetector
 
 
+# State bits
+_PENDING = 1   # a first clap is waiting to become SINGLE or DOUBLE
+_ABOVE = 2     # RMS was above threshold on the previous sample
+
+# Event bits
+_LOUD = 1      # rms > threshold
+_EXPIRED = 2   # double-clap window has elapsed since the last clap
+_GAP_OK = 4    # minimum gap between claps has elapsed
+
+_ACTIONS = (None, "SINGLE", "DOUBLE")
+
+
+def _transition(state: int, event: int) -> tuple:
+    """Reference clap logic for one (state, event) pair -> (new_state, action, stamp_clap)"""
+    pending = bool(state & _PENDING)
+    above = bool(state & _ABOVE)
+    
+    if pending and event & _EXPIRED:
+        return state & ~_PENDING, 1, False
+    
+    if not event & _LOUD:
+        return state & ~_ABOVE, 0, False
+    if above:
+        return state, 0, False
+    if pending and event & _GAP_OK:
+        return _ABOVE, 2, True
+    return _ABOVE | _PENDING, 0, True
+
+
+# 4 states x 8 events, indexed by (state << 3) | event
+_TRANSITIONS = tuple(_transition(i >> 3, i & 7) for i in range(32))
+
+
 class ClapDetector(BaseDetector):
     """Detector for single and double claps"""
     
@@ -20,42 +53,38 @@ class ClapDetector(BaseDetector):
             double_clap_window_ms: Time window to detect double clap
         """
         self.threshold = threshold
-        self.double_clap_window = double_clap_window_ms / 1000.0
-        self.min_clap_gap = 0.1
+        # Integer nanosecond windows for time.monotonic_ns() comparisons
+        self.double_clap_window_ns = double_clap_window_ms * 1_000_000
+        self.min_clap_gap_ns = 100_000_000
         
-        self.last_clap_time: Optional[float] = None
-        self.last_action_time: float = 0
-        self.is_above_threshold = False
-        self.pending_single = False
+        self.state = 0
+        self.last_clap_ns: int = 0
+        self.last_action_ns: int = 0
+    
+    @property
+    def is_above_threshold(self) -> bool:
+        """True while the signal stays above threshold after a rising edge"""
+        return bool(self.state & _ABOVE)
+    
+    @property
+    def pending_single(self) -> bool:
+        """True while a first clap waits to resolve as SINGLE or DOUBLE"""
+        return bool(self.state & _PENDING)
     
     def process(self, rms: float) -> Optional[str]:
         """Process RMS value and detect single or double clap"""
-        current_time = time.time()
-        
-        if self.pending_single and self.last_clap_time is not None:
-            if (current_time - self.last_clap_time) > self.double_clap_window:
-                self.pending_single = False
-                self.last_action_time = current_time
-                return "SINGLE"
-        
-        if rms > self.threshold:
-            if not self.is_above_threshold:
-                self.is_above_threshold = True
-                
-                if self.pending_single and self.last_clap_time is not None:
-                    time_since_last = current_time - self.last_clap_time
-                    if time_since_last >= self.min_clap_gap and time_since_last <= self.double_clap_window:
-                        self.pending_single = False
-                        self.last_clap_time = current_time
-                        self.last_action_time = current_time
-                        return "DOUBLE"
-                
-                self.last_clap_time = current_time
-                self.pending_single = True
-        else:
-            self.is_above_threshold = False
+        now_ns = time.monotonic_ns()
+        since_last_ns = now_ns - self.last_clap_ns
+        event = ((rms > self.threshold)
+                 | (since_last_ns > self.double_clap_window_ns) << 1
+                 | (since_last_ns >= self.min_clap_gap_ns) << 2)
         
-        return None
+        self.state, action, stamp_clap = _TRANSITIONS[(self.state << 3) | event]
+        if stamp_clap:
+            self.last_clap_ns = now_ns
+        if action:
+            self.last_action_ns = now_ns
+        return _ACTIONS[action]
 
     def start(self):
         """Startup (no-op)"""
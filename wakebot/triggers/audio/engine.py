@@ -3,10 +3,14 @@ WakeBot Audio Engine
 Handles microphone stream initialization and audio capture.
 """
 
+import math
+import platform
 import pyaudio
 import numpy as np
 import time
-from typing import Optional
+import threading
+from collections import deque
+from typing import Callable, Optional
 
 try:
     import torch
@@ -18,7 +22,7 @@ except ImportError:
 class AudioStream:
     """Manages PyAudio microphone stream with error recovery and GPU acceleration."""
     
-    def __init__(self, chunk_size: int = 1024, sample_rate: int = 44100, 
+    def __init__(self, chunk_size: int = 256, sample_rate: int = 44100, 
                  channels: int = 1, format_type: int = pyaudio.paInt16):
         """
         Initialize AudioStream
@@ -31,11 +35,40 @@ class AudioStream:
         self.pyaudio_instance: Optional[pyaudio.PyAudio] = None
         self.stream: Optional[pyaudio.Stream] = None
         
+        # Callback-mode capture: PortAudio's thread hands each buffer over as a
+        # zero-copy int16 view; deque append/popleft make this a SPSC ring.
+        self._frames: deque = deque(maxlen=64)
+        self._frame_ready = threading.Event()
+        
+        # Optional consumer run directly on the callback thread instead of
+        # queueing frames for read_chunk(); must be fast and must not raise.
+        self.chunk_handler: Optional[Callable[[np.ndarray], None]] = None
+        
+        # Cached stream status (is_active() is a PortAudio round-trip)
+        self._active = False
+        self._active_checked_at = float("-inf")
+        
+        # monotonic() of the last callback; a stalled or unplugged device can
+        # stop delivering buffers while is_active() still reports True
+        self._last_audio_at = 0.0
+        
+        # Loop invariants for per-chunk math
+        self._inv_n = 1.0 / chunk_size
+        
+        # Onset detection: Hann-windowed energy over the last two chunks (50% overlap).
+        # History holds squared samples so each sample is squared only once.
+        self._onset_window = 2 * chunk_size
+        self._hann_sq = (np.hanning(self._onset_window) ** 2).astype(np.float32)
+        self._hann_sq /= self._hann_sq.sum()
+        self._onset_sq = np.zeros(self._onset_window, dtype=np.float32)
+        self._prev_energy = 0.0
+        
         # GPU State
         self._device = "cuda" if (HAS_TORCH and torch.cuda.is_available()) else "cpu"
         
     def start_stream(self) -> bool:
         """Open microphone stream"""
+        self._active_checked_at = float("-inf")
         try:
             if self.pyaudio_instance is None:
                 self.pyaudio_instance = pyaudio.PyAudio()
@@ -47,39 +80,91 @@ class AudioStream:
                 except:
                     pass
             
-            self.stream = self.pyaudio_instance.open(
+            self._frames.clear()
+            # Count the stall timeout from the (re)open, not the last old buffer
+            self._last_audio_at = time.monotonic()
+            open_kwargs = dict(
                 format=self.format_type,
                 channels=self.channels,
                 rate=self.sample_rate,
                 input=True,
-                frames_per_buffer=self.chunk_size
+                frames_per_buffer=self.chunk_size,
+                stream_callback=self._on_audio
             )
             
+            self.stream = None
+            device_index = self._low_latency_input_device()
+            if device_index is not None:
+                try:
+                    self.stream = self.pyaudio_instance.open(
+                        input_device_index=device_index, **open_kwargs
+                    )
+                except Exception:
+                    self.stream = None
+            if self.stream is None:
+                self.stream = self.pyaudio_instance.open(**open_kwargs)
+            
             if not self.stream.is_active():
                 self.stream.start_stream()
             
-            # Prime the stream
-            try:
-                self.stream.read(self.chunk_size, exception_on_overflow=False)
-            except:
-                pass
-            
             return True
             
         except Exception as e:
             print(f"Failed to start audio stream: {e}")
             return False
     
-    def read_chunk(self) -> np.ndarray:
+    def _low_latency_input_device(self) -> Optional[int]:
+        """
+        Default input device of the platform's low-latency host API, if any.
+        
+        PyAudio opens on the default host API, which on Windows is MME with
+        tens of milliseconds of extra buffering; WASAPI (shared mode) avoids
+        that. Other platforms already default to ALSA/CoreAudio.
+        
+        Shared mode only accepts the device mix rate, so the device is only
+        offered when sample_rate matches it (e.g. 48000 on most hardware).
+        """
+        if platform.system() != "Windows":
+            return None
+        try:
+            api_info = self.pyaudio_instance.get_host_api_info_by_type(pyaudio.paWASAPI)
+            device_index = api_info.get("defaultInputDevice", -1)
+            if device_index < 0:
+                return None
+            device_info = self.pyaudio_instance.get_device_info_by_index(device_index)
+        except Exception:
+            return None
+        if int(device_info.get("defaultSampleRate", 0)) != self.sample_rate:
+            return None
+        return device_index
+    
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: hand the captured buffer on without copying it"""
+        self._last_audio_at = time.monotonic()
+        chunk = np.frombuffer(in_data, dtype=np.int16)
+        if self.chunk_handler is not None:
+            self.chunk_handler(chunk)
+        else:
+            self._frames.append(chunk)
+            self._frame_ready.set()
+        return (None, pyaudio.paContinue)
+    
+    def read_chunk(self, timeout: float = 1.0) -> np.ndarray:
         """Read audio chunk from microphone as numpy array"""
         if self.stream is None:
             raise Exception("Stream not initialized.")
         
-        try:
-            data = self.stream.read(self.chunk_size, exception_on_overflow=False)
-            return np.frombuffer(data, dtype=np.int16)
-        except Exception as e:
-            raise Exception(f"Stream read error: {e}")
+        while True:
+            try:
+                return self._frames.popleft()
+            except IndexError:
+                pass
+            self._frame_ready.clear()
+            # Re-check after clearing so a frame queued in between isn't missed
+            if self._frames:
+                continue
+            if not self._frame_ready.wait(timeout):
+                raise Exception(f"Stream read error: no audio for {timeout:.1f}s")
     
     def calculate_rms(self, audio_data: np.ndarray) -> float:
         """Compute Root Mean Square of audio chunk. GPU accelerated if possible."""
@@ -97,12 +182,53 @@ class AudioStream:
             # Fallback to CPU if GPU fails
             pass
             
-        # CPU Fallback (NumPy)
-        audio_float = audio_data.astype(np.float64)
-        return np.sqrt(np.mean(audio_float ** 2))
+        return self.calculate_rms_cpu(audio_data)
+
+    def calculate_rms_cpu(self, audio_data: np.ndarray) -> float:
+        """
+        RMS of audio chunk on the CPU only.
+        
+        Safe for PortAudio's callback thread: a GPU round-trip costs more
+        than it saves at this chunk size.
+        """
+        n = len(audio_data)
+        if n == 0:
+            return 0.0
+        # int16 squares sum exactly in int64, so einsum can fuse
+        # square+reduce without a float64 temporary
+        if audio_data.dtype.kind == "i":
+            sum_sq = int(np.einsum("i,i->", audio_data, audio_data, dtype=np.int64))
+        else:
+            sum_sq = float(np.dot(audio_data, audio_data))
+        return math.sqrt(sum_sq * (self._inv_n if n == self.chunk_size else 1.0 / n))
+    
+    def onset_strength(self, audio_data: np.ndarray) -> float:
+        """
+        Energy novelty of the latest chunk, in RMS units.
+        
+        Computes the Hann-windowed mean-square energy of the most recent
+        samples, then half-wave rectifies its rise since the previous chunk.
+        Transients such as claps score high, while sustained loud sounds
+        score near zero. Must be fed every chunk, in order.
+        """
+        if len(audio_data) == 0:
+            return 0.0
+        
+        sq = self._onset_sq
+        n = min(len(audio_data), len(sq))
+        sq[:-n] = sq[n:]
+        latest = sq[-n:]
+        latest[:] = audio_data[-n:]
+        np.multiply(latest, latest, out=latest)
+        
+        energy = float(np.dot(sq, self._hann_sq))
+        rise = energy - self._prev_energy
+        self._prev_energy = energy
+        return math.sqrt(rise) if rise > 0 else 0.0
     
     def stop_stream(self):
         """Clean shutdown"""
+        self._active_checked_at = float("-inf")
         try:
             if self.stream is not None:
                 self.stream.stop_stream()
@@ -114,12 +240,39 @@ class AudioStream:
         except:
             pass
     
-    def restart_stream(self) -> bool:
-        """Auto-restart stream on failure"""
-        time.sleep(1)
+    def restart_stream(self, attempt: int = 0) -> bool:
+        """
+        Auto-restart stream on failure
+        
+        Args:
+            attempt: Consecutive failed restarts so far. The pause before
+                reopening backs off exponentially from 50 ms, capped at 250 ms.
+        """
+        time.sleep(min(0.25, 0.05 * (1 << min(attempt, 3))))
         self.stop_stream()
         return self.start_stream()
 
-    def is_stream_active(self) -> bool:
-        """Check if stream is active"""
-        return self.stream is not None and self.stream.is_active()
+    def is_stream_active(self, max_age: float = 0.0) -> bool:
+        """
+        Check if stream is active
+        
+        Args:
+            max_age: Reuse the last result if it is younger than this many
+                seconds. Stream death is not a sub-second event, so hot loops
+                can poll with a small TTL instead of hitting PortAudio each time.
+        """
+        now = time.monotonic()
+        if now - self._active_checked_at >= max_age:
+            self._active = self.stream is not None and self.stream.is_active()
+            self._active_checked_at = now
+        return self._active
+
+    def is_stalled(self, timeout: float = 1.0) -> bool:
+        """
+        Check if an open stream has stopped delivering audio
+        
+        Args:
+            timeout: Seconds without a callback before the stream counts
+                as stalled.
+        """
+        return self.stream is not None and time.monotonic() - self._last_audio_at > timeout
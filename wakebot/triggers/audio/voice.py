@@ -46,6 +46,10 @@ class VoiceDetector(BaseDetector):
                 self.recognizer = None
 
         self.audio_queue = queue.Queue()
+        # Small capture chunks are batched (~90 ms at 44.1 kHz) so Vosk gets
+        # one AcceptWaveform call per batch instead of one per chunk
+        self._pending = bytearray()
+        self._batch_bytes = 2 * 4000  # 4000 int16 frames
         self.is_running = False
         self.phrase_detected = False
         self._thread = None
@@ -53,7 +57,10 @@ class VoiceDetector(BaseDetector):
     def add_audio(self, audio_data: np.ndarray):
         """Add raw audio data (int16) to the processing queue"""
         if self.is_running and self.recognizer:
-            self.audio_queue.put(audio_data.tobytes())
+            self._pending += audio_data.tobytes()
+            if len(self._pending) >= self._batch_bytes:
+                self.audio_queue.put(bytes(self._pending))
+                self._pending.clear()
 
     def process(self, data: Any) -> Optional[str]:
         """Process audio data and check for keyword detection"""
@@ -99,6 +106,7 @@ class VoiceDetector(BaseDetector):
         if self.recognizer and not self.is_running:
             self.is_running = True
             self.phrase_detected = False
+            self._pending.clear()
             self._thread = threading.Thread(target=self._processing_loop, daemon=True)
             self._thread.start()
             self.logger.info("Voice Detector thread active.")